@@ -1,10 +1,11 @@
 use lazy_static::lazy_static;
 use serde::{Deserialize, Serialize};
+use std::borrow::Cow;
 use std::collections::HashMap;
 use std::fmt;
 
 /// Key type enumeration
-#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Hash, Serialize, Deserialize)]
 pub enum KeyType {
     Character(char),
     Arrow(ArrowDirection),
@@ -14,16 +15,27 @@ pub enum KeyType {
     Unknown(u16),
 }
 
+/// Printable ASCII in code point order, sliced to name character keys
+const PRINTABLE_ASCII: &str = " !\"#$%&'()*+,-./0123456789:;<=>?@\
+ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`abcdefghijklmnopqrstuvwxyz{|}~";
+
 impl KeyType {
     /// Get a human-readable name for this key type
-    pub fn name(&self) -> String {
+    ///
+    /// Every mapped key except function keys gets a borrowed static name,
+    /// so naming a keystroke normally doesn't allocate.
+    pub fn name(&self) -> Cow<'static, str> {
         match self {
-            KeyType::Character(c) => c.to_string(),
-            KeyType::Arrow(dir) => format!("arrow:{:?}", dir).to_lowercase(),
-            KeyType::Modifier(m) => format!("modifier:{:?}", m).to_lowercase(),
-            KeyType::Special(s) => format!("special:{:?}", s).to_lowercase(),
-            KeyType::Function(n) => format!("F{}", n),
-            KeyType::Unknown(code) => format!("unknown:{}", code),
+            KeyType::Character(c) if (' '..='~').contains(c) => {
+                let i = *c as usize - ' ' as usize;
+                Cow::Borrowed(&PRINTABLE_ASCII[i..=i])
+            }
+            KeyType::Character(c) => Cow::Owned(c.to_string()),
+            KeyType::Arrow(dir) => Cow::Borrowed(dir.name()),
+            KeyType::Modifier(m) => Cow::Borrowed(m.name()),
+            KeyType::Special(s) => Cow::Borrowed(s.name()),
+            KeyType::Function(n) => Cow::Owned(format!("F{}", n)),
+            KeyType::Unknown(code) => Cow::Owned(format!("unknown:{}", code)),
         }
     }
 }
@@ -41,7 +53,7 @@ impl fmt::Display for KeyType {
     }
 }
 
-#[derive(Debug, Clone, Copy, PartialEq, Eq, Serialize, Deserialize)]
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Hash, Serialize, Deserialize)]
 pub enum ArrowDirection {
     Up,
     Down,
@@ -49,7 +61,19 @@ pub enum ArrowDirection {
     Right,
 }
 
-#[derive(Debug, Clone, Copy, PartialEq, Eq, Serialize, Deserialize)]
+impl ArrowDirection {
+    /// Canonical lowercase key name
+    pub fn name(self) -> &'static str {
+        match self {
+            ArrowDirection::Up => "arrow:up",
+            ArrowDirection::Down => "arrow:down",
+            ArrowDirection::Left => "arrow:left",
+            ArrowDirection::Right => "arrow:right",
+        }
+    }
+}
+
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Hash, Serialize, Deserialize)]
 pub enum ModifierKey {
     Shift,
     Control,
@@ -59,7 +83,21 @@ pub enum ModifierKey {
     Function,
 }
 
-#[derive(Debug, Clone, Copy, PartialEq, Eq, Serialize, Deserialize)]
+impl ModifierKey {
+    /// Canonical lowercase key name
+    pub fn name(self) -> &'static str {
+        match self {
+            ModifierKey::Shift => "modifier:shift",
+            ModifierKey::Control => "modifier:control",
+            ModifierKey::Option => "modifier:option",
+            ModifierKey::Command => "modifier:command",
+            ModifierKey::CapsLock => "modifier:capslock",
+            ModifierKey::Function => "modifier:function",
+        }
+    }
+}
+
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Hash, Serialize, Deserialize)]
 pub enum SpecialKey {
     Return,
     Tab,
@@ -74,6 +112,25 @@ pub enum SpecialKey {
     PageDown,
 }
 
+impl SpecialKey {
+    /// Canonical lowercase key name
+    pub fn name(self) -> &'static str {
+        match self {
+            SpecialKey::Return => "special:return",
+            SpecialKey::Tab => "special:tab",
+            SpecialKey::Escape => "special:escape",
+            SpecialKey::Delete => "special:delete",
+            SpecialKey::Backspace => "special:backspace",
+            SpecialKey::Space => "special:space",
+            SpecialKey::ForwardDelete => "special:forwarddelete",
+            SpecialKey::Home => "special:home",
+            SpecialKey::End => "special:end",
+            SpecialKey::PageUp => "special:pageup",
+            SpecialKey::PageDown => "special:pagedown",
+        }
+    }
+}
+
 // macOS keycode mapping based on Carbon.h and actual testing
 lazy_static! {
     pub static ref KEYCODE_MAP: HashMap<u16, KeyType> = {
@@ -178,16 +235,34 @@ lazy_static! {
 
         m
     };
+
+    /// Dense lookup table indexed by keycode, built once from `KEYCODE_MAP`
+    static ref KEYCODE_TABLE: [Option<KeyType>; KEYCODE_TABLE_SIZE] = {
+        let mut table: [Option<KeyType>; KEYCODE_TABLE_SIZE] = std::array::from_fn(|_| None);
+        for (&code, key) in KEYCODE_MAP.iter() {
+            table[code as usize] = Some(*key);
+        }
+        table
+    };
 }
 
+/// macOS virtual keycodes all fall below 128
+const KEYCODE_TABLE_SIZE: usize = 128;
+
 /// Convert macOS keycode to KeyType
 pub fn keycode_to_key(keycode: u16) -> KeyType {
-    KEYCODE_MAP
-        .get(&keycode)
-        .cloned()
+    KEYCODE_TABLE
+        .get(keycode as usize)
+        .copied()
+        .flatten()
         .unwrap_or(KeyType::Unknown(keycode))
 }
 
+/// Iterate over every key with a known keycode mapping
+pub fn known_keys() -> impl Iterator<Item = &'static KeyType> {
+    KEYCODE_MAP.values()
+}
+
 #[cfg(test)]
 mod tests {
     use super::*;
@@ -235,6 +310,17 @@ mod tests {
         assert_eq!(keycode_to_key(999), KeyType::Unknown(999));
     }
 
+    #[test]
+    fn test_table_matches_map() {
+        for code in 0..KEYCODE_TABLE_SIZE as u16 {
+            let expected = KEYCODE_MAP
+                .get(&code)
+                .cloned()
+                .unwrap_or(KeyType::Unknown(code));
+            assert_eq!(keycode_to_key(code), expected);
+        }
+    }
+
     #[test]
     fn test_all_printable_chars_mapped() {
         let letters = "asdfghjklqwertyuiopzxcvbnm";
@@ -264,4 +350,27 @@ mod tests {
         );
         assert_eq!(KeyType::Function(5).name(), "F5");
     }
+
+    #[test]
+    fn test_ascii_names_are_borrowed() {
+        for c in ' '..='~' {
+            let name = KeyType::Character(c).name();
+            assert!(matches!(name, Cow::Borrowed(_)));
+            assert_eq!(name, c.to_string());
+        }
+        assert_eq!(KeyType::Character('é').name(), "é");
+    }
+
+    #[test]
+    fn test_key_names_match_debug_lowercase() {
+        for key in KEYCODE_MAP.values() {
+            let expected = match key {
+                KeyType::Arrow(d) => format!("arrow:{:?}", d).to_lowercase(),
+                KeyType::Modifier(m) => format!("modifier:{:?}", m).to_lowercase(),
+                KeyType::Special(s) => format!("special:{:?}", s).to_lowercase(),
+                _ => continue,
+            };
+            assert_eq!(key.name(), expected);
+        }
+    }
 }
@@ -3,7 +3,7 @@ mod keymap;
 pub mod window;
 
 pub use event_tap::{start_capture, CaptureError};
-pub use keymap::{keycode_to_key, ArrowDirection, KeyType, ModifierKey, SpecialKey};
+pub use keymap::{keycode_to_key, known_keys, ArrowDirection, KeyType, ModifierKey, SpecialKey};
 
 use chrono::{DateTime, Utc};
 use serde::{Deserialize, Serialize};
@@ -29,16 +29,25 @@ impl KeyEvent {
     }
 }
 
-/// Modifier key state
-#[derive(Debug, Clone, Copy, Default, Serialize, Deserialize)]
-pub struct Modifiers {
-    pub shift: bool,
-    pub control: bool,
-    pub option: bool,
-    pub command: bool,
-}
+/// Modifier key state, one bit per modifier
+#[derive(Debug, Clone, Copy, Default, PartialEq, Eq, Serialize, Deserialize)]
+#[serde(try_from = "u8", into = "u8")]
+pub struct Modifiers(u8);
+
+/// Display names for every modifier combination, indexed by bitmask
+const COMBO_NAMES: [&str; 16] = [
+    "", "Shift", "Ctrl", "Ctrl+Shift",
+    "Opt", "Opt+Shift", "Ctrl+Opt", "Ctrl+Opt+Shift",
+    "Cmd", "Shift+Cmd", "Ctrl+Cmd", "Ctrl+Shift+Cmd",
+    "Opt+Cmd", "Opt+Shift+Cmd", "Ctrl+Opt+Cmd", "Ctrl+Opt+Shift+Cmd",
+];
 
 impl Modifiers {
+    pub const SHIFT: u8 = 1 << 0;
+    pub const CONTROL: u8 = 1 << 1;
+    pub const OPTION: u8 = 1 << 2;
+    pub const COMMAND: u8 = 1 << 3;
+
     pub fn from_flags(flags: u64) -> Self {
         // macOS CGEventFlags values
         const SHIFT: u64 = 0x00020000;
@@ -46,35 +55,62 @@ impl Modifiers {
         const OPTION: u64 = 0x00080000;
         const COMMAND: u64 = 0x00100000;
 
-        Self {
-            shift: (flags & SHIFT) != 0,
-            control: (flags & CONTROL) != 0,
-            option: (flags & OPTION) != 0,
-            command: (flags & COMMAND) != 0,
+        let mut bits = 0;
+        for (flag, bit) in [
+            (SHIFT, Self::SHIFT),
+            (CONTROL, Self::CONTROL),
+            (OPTION, Self::OPTION),
+            (COMMAND, Self::COMMAND),
+        ] {
+            if flags & flag != 0 {
+                bits |= bit;
+            }
         }
+        Self(bits)
+    }
+
+    pub fn shift(&self) -> bool {
+        self.0 & Self::SHIFT != 0
+    }
+
+    pub fn control(&self) -> bool {
+        self.0 & Self::CONTROL != 0
+    }
+
+    pub fn option(&self) -> bool {
+        self.0 & Self::OPTION != 0
+    }
+
+    pub fn command(&self) -> bool {
+        self.0 & Self::COMMAND != 0
     }
 
     pub fn is_empty(&self) -> bool {
-        !self.shift && !self.control && !self.option && !self.command
+        self.0 == 0
+    }
+}
+
+impl TryFrom<u8> for Modifiers {
+    type Error = String;
+
+    /// Reject bits outside the four known modifiers
+    fn try_from(bits: u8) -> Result<Self, Self::Error> {
+        if bits as usize >= COMBO_NAMES.len() {
+            return Err(format!("invalid modifier bits: {:#04x}", bits));
+        }
+        Ok(Self(bits))
+    }
+}
+
+impl From<Modifiers> for u8 {
+    fn from(mods: Modifiers) -> Self {
+        mods.0
     }
 }
 
 impl fmt::Display for Modifiers {
     fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
-        let mut parts = Vec::new();
-        if self.control {
-            parts.push("Ctrl");
-        }
-        if self.option {
-            parts.push("Opt");
-        }
-        if self.shift {
-            parts.push("Shift");
-        }
-        if self.command {
-            parts.push("Cmd");
-        }
-        write!(f, "{}", parts.join("+"))
+        f.write_str(COMBO_NAMES[self.0 as usize])
     }
 }
 
@@ -86,20 +122,29 @@ mod tests {
     fn test_modifiers_from_flags() {
         let flags = 0x00020000; // Shift
         let mods = Modifiers::from_flags(flags);
-        assert!(mods.shift);
-        assert!(!mods.control);
-        assert!(!mods.option);
-        assert!(!mods.command);
+        assert!(mods.shift());
+        assert!(!mods.control());
+        assert!(!mods.option());
+        assert!(!mods.command());
     }
 
     #[test]
     fn test_modifiers_display() {
-        let mods = Modifiers {
-            shift: true,
-            control: true,
-            option: false,
-            command: false,
-        };
+        let mods = Modifiers::from_flags(0x00020000 | 0x00040000); // Shift + Control
         assert_eq!(mods.to_string(), "Ctrl+Shift");
+
+        let all = Modifiers::from_flags(0x001E0000);
+        assert_eq!(all.to_string(), "Ctrl+Opt+Shift+Cmd");
+        assert_eq!(Modifiers::default().to_string(), "");
+    }
+
+    #[test]
+    fn test_modifiers_deserialize_rejects_unknown_bits() {
+        let mods: Modifiers = serde_json::from_str("5").unwrap();
+        assert_eq!(mods.to_string(), "Opt+Shift");
+        assert_eq!(serde_json::to_string(&mods).unwrap(), "5");
+
+        assert!(serde_json::from_str::<Modifiers>("16").is_err());
+        assert!(serde_json::from_str::<Modifiers>("255").is_err());
     }
 }
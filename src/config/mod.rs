@@ -1,9 +1,12 @@
 //! Configuration management for kstrk
 
+use crate::capture::{known_keys, KeyEvent, KeyType};
 use directories::ProjectDirs;
 use serde::{Deserialize, Serialize};
 use std::collections::HashSet;
-use std::path::PathBuf;
+use std::fs::File;
+use std::io::Write;
+use std::path::{Path, PathBuf};
 
 #[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct Config {
@@ -135,39 +138,76 @@ impl Config {
     }
 
     /// Save configuration to file
+    ///
+    /// Written to a temporary file, synced to disk and renamed into place,
+    /// so a crash or power loss mid-save never leaves a truncated config
+    /// behind.
     pub fn save(&self) -> Result<(), crate::Error> {
         if let Some(path) = Self::config_path() {
-            if let Some(parent) = path.parent() {
-                std::fs::create_dir_all(parent)?;
-            }
+            let parent = path.parent().unwrap_or_else(|| Path::new("."));
+            std::fs::create_dir_all(parent)?;
             let content = toml::to_string_pretty(self)
                 .map_err(|e| crate::Error::Config(e.to_string()))?;
-            std::fs::write(&path, content)?;
+
+            let tmp_path = path.with_extension("toml.tmp");
+            let written = write_synced(&tmp_path, content.as_bytes())
+                .and_then(|()| std::fs::rename(&tmp_path, &path));
+            if let Err(e) = written {
+                let _ = std::fs::remove_file(&tmp_path);
+                return Err(e.into());
+            }
+
+            // Sync the directory too, so the rename itself survives a crash
+            File::open(parent)?.sync_all()?;
         }
         Ok(())
     }
 }
 
+/// Write `contents` to `path` and wait until it has reached the disk
+fn write_synced(path: &Path, contents: &[u8]) -> std::io::Result<()> {
+    let mut file = File::create(path)?;
+    file.write_all(contents)?;
+    file.sync_all()
+}
+
 /// Filter for ignoring certain keys
 pub struct IgnoreFilter {
-    ignored_keys: HashSet<String>,
+    // Configured names resolved to keys once, so lookups don't build strings
+    ignored_keys: HashSet<KeyType>,
     ignore_lone_modifiers: bool,
 }
 
 impl IgnoreFilter {
     pub fn from_config(config: &Config) -> Self {
+        let names: HashSet<&str> = config
+            .capture
+            .ignore_keys
+            .iter()
+            .map(String::as_str)
+            .collect();
+
+        let mut ignored_keys: HashSet<KeyType> = known_keys()
+            .filter(|key| names.contains(&*key.name()))
+            .copied()
+            .collect();
+        // Unmapped keycodes are named "unknown:<code>"
+        ignored_keys.extend(names.iter().filter_map(|name| {
+            name.strip_prefix("unknown:")?
+                .parse()
+                .ok()
+                .map(KeyType::Unknown)
+        }));
+
         Self {
-            ignored_keys: config.capture.ignore_keys.iter().cloned().collect(),
+            ignored_keys,
             ignore_lone_modifiers: config.capture.ignore_lone_modifiers,
         }
     }
 
-    pub fn should_ignore(&self, event: &crate::capture::KeyEvent) -> bool {
-        use crate::capture::KeyType;
-
+    pub fn should_ignore(&self, event: &KeyEvent) -> bool {
         // Check explicit ignore list
-        let key_name = event.key_type.name();
-        if self.ignored_keys.contains(&key_name) {
+        if self.ignored_keys.contains(&event.key_type) {
             return true;
         }
 
@@ -201,4 +241,18 @@ mod tests {
         let deserialized: Config = toml::from_str(&serialized).unwrap();
         assert_eq!(config.capture.token_gap_threshold, deserialized.capture.token_gap_threshold);
     }
+
+    #[test]
+    fn test_ignore_filter() {
+        let mut config = Config::default();
+        config.capture.ignore_keys = vec!["special:tab".to_string(), "unknown:200".to_string()];
+        config.capture.ignore_lone_modifiers = false;
+        let filter = IgnoreFilter::from_config(&config);
+
+        let event = |keycode| KeyEvent::new(keycode, chrono::Utc::now(), 0);
+        assert!(filter.should_ignore(&event(48))); // Tab
+        assert!(filter.should_ignore(&event(200)));
+        assert!(!filter.should_ignore(&event(0))); // 'a'
+        assert!(!filter.should_ignore(&event(56))); // Shift
+    }
 }
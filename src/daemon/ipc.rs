@@ -69,7 +69,7 @@ impl Client {
     }
 
     pub fn is_running() -> bool {
-        // Check if daemon is running by checking PID file
+        // Check if daemon is running by probing its instance lock
         super::Daemon::is_running()
     }
 }
@@ -6,14 +6,17 @@ mod lock;
 pub use ipc::{Client, Request, Response, StatusInfo};
 pub use lock::{InstanceLock, LockError};
 
-use crate::capture::{start_capture, KeyEvent};
+use crate::capture::{start_capture, KeyEvent, KeyType};
 use crate::config::Config;
 use crate::stats::LiveStats;
 use crate::storage::SqliteStorage;
+use chrono::{DateTime, Utc};
+use std::collections::HashMap;
 use std::path::PathBuf;
 use std::sync::atomic::{AtomicBool, Ordering};
-use std::sync::{mpsc, Arc};
-use std::time::Duration;
+use std::sync::mpsc::{self, RecvTimeoutError};
+use std::sync::Arc;
+use std::time::{Duration, Instant};
 use thiserror::Error;
 
 #[derive(Error, Debug)]
@@ -21,9 +24,6 @@ pub enum DaemonError {
     #[error("Failed to daemonize: {0}")]
     DaemonizeFailed(String),
 
-    #[error("Invalid PID file")]
-    InvalidPidFile,
-
     #[error("Lock error: {0}")]
     Lock(#[from] LockError),
 
@@ -32,15 +32,32 @@ pub enum DaemonError {
 
     #[error("Capture error: {0}")]
     Capture(String),
+
+    #[error("Storage error: {0}")]
+    Storage(#[from] rusqlite::Error),
 }
 
-pub const PID_FILE: &str = "/tmp/kstrk.pid";
+/// How often the event loop wakes to check for shutdown when idle
+const SHUTDOWN_POLL_INTERVAL: Duration = Duration::from_millis(100);
+
+/// How often aggregated counts are written to storage
+///
+/// Counts are flushed on every clean shutdown (SIGINT/SIGTERM), so this
+/// bounds what a crash or SIGKILL can lose.
+const FLUSH_INTERVAL: Duration = Duration::from_secs(1);
 
 pub struct Daemon {
     config: Config,
     storage: SqliteStorage,
     stats: LiveStats,
     running: Arc<AtomicBool>,
+
+    // Counts not yet written; heatmap counts keyed by (hour bucket, key),
+    // with key names only produced when flushed
+    pending_keystrokes: u32,
+    pending_started_at: Option<DateTime<Utc>>,
+    pending_hourly: HashMap<(i64, KeyType), u64>,
+    last_flush: Instant,
 }
 
 impl Daemon {
@@ -59,6 +76,10 @@ impl Daemon {
             storage,
             stats,
             running: Arc::new(AtomicBool::new(true)),
+            pending_keystrokes: 0,
+            pending_started_at: None,
+            pending_hourly: HashMap::new(),
+            last_flush: Instant::now(),
         })
     }
 
@@ -80,66 +101,114 @@ impl Daemon {
         println!("Starting kstrk in foreground mode...");
         println!("Press Ctrl+C to stop.");
 
-        let mut daemon = Daemon::new(config)?;
-
-        // Setup signal handler
-        let running = daemon.running.clone();
+        // Setup signal handler before opening storage, so a signal during
+        // startup still unwinds through the lock's Drop. Covers SIGINT and
+        // SIGTERM (ctrlc's "termination" feature), so `kill` and launchd
+        // stop the daemon as cleanly as Ctrl+C. Repeated signals collapse
+        // into the first one.
+        let running = Arc::new(AtomicBool::new(true));
+        let handler_running = running.clone();
         ctrlc::set_handler(move || {
-            println!("\nShutting down...");
-            running.store(false, Ordering::SeqCst);
+            if handler_running.swap(false, Ordering::SeqCst) {
+                println!("\nShutting down...");
+            }
         })
         .map_err(|e| DaemonError::Capture(e.to_string()))?;
 
+        let mut daemon = Daemon::new(config)?;
+        daemon.running = running;
+
         // Start capture in separate thread
         let (tx, rx) = mpsc::channel::<KeyEvent>();
         let capture_thread = std::thread::spawn(move || start_capture(tx));
 
-        // Main loop
+        // Main loop: block until a keystroke arrives, waking periodically to
+        // observe shutdown requests and flush aggregated counts
+        let mut result = Ok(());
         while daemon.running.load(Ordering::SeqCst) {
-            // Process incoming keystrokes
-            while let Ok(event) = rx.try_recv() {
-                daemon.process_event(event);
+            let received = rx.recv_timeout(SHUTDOWN_POLL_INTERVAL);
+            let now = Instant::now();
+            match received {
+                Ok(event) => daemon.process_event(event, now),
+                Err(RecvTimeoutError::Timeout) => {}
+                Err(RecvTimeoutError::Disconnected) => {
+                    // Capture thread has exited; report why instead of idling
+                    result = match capture_thread.join() {
+                        Ok(Ok(())) => Ok(()),
+                        Ok(Err(e)) => Err(DaemonError::Capture(e.to_string())),
+                        Err(_) => Err(DaemonError::Capture(
+                            "capture thread panicked".to_string(),
+                        )),
+                    };
+                    break;
+                }
             }
 
-            std::thread::sleep(Duration::from_millis(10));
+            if now.duration_since(daemon.last_flush) >= FLUSH_INTERVAL {
+                // Counts stay pending, so the next flush retries them
+                if let Err(e) = daemon.flush(now) {
+                    eprintln!("Failed to write keystrokes: {}", e);
+                }
+            }
         }
 
+        let flushed = daemon.flush(Instant::now());
         println!("Daemon stopped.");
-        Ok(())
+        result.and(flushed)
     }
 
-    fn process_event(&mut self, event: KeyEvent) {
+    /// Handle one keystroke received at `now`
+    fn process_event(&mut self, event: KeyEvent, now: Instant) {
         // Update live stats
-        if let Some(milestone) = self.stats.record() {
+        if let Some(milestone) = self.stats.record_at(now, event.timestamp) {
             println!("{} Milestone reached: {}", milestone.emoji, milestone.name);
         }
 
-        // Record to storage (with default window for now)
-        let _ = self.storage.record_keystroke("Unknown", "Unknown", 1);
-
-        // Record hourly stat for heatmap
+        // Count towards storage totals and the hourly heatmap; written out
+        // by flush()
+        self.pending_keystrokes += 1;
+        self.pending_started_at.get_or_insert(event.timestamp);
         let hour_bucket = event.timestamp.timestamp() / 3600;
-        let _ = self
-            .storage
-            .record_hourly_stat(hour_bucket, &event.key_type.name());
+        *self
+            .pending_hourly
+            .entry((hour_bucket, event.key_type))
+            .or_insert(0) += 1;
     }
 
-    pub fn is_running() -> bool {
-        if !std::path::Path::new(PID_FILE).exists() {
-            return false;
-        }
-        // Verify process is actually alive
-        if let Ok(pid) = Self::read_pid() {
-            unsafe { libc::kill(pid as i32, 0) == 0 }
-        } else {
-            false
-        }
+    /// Write counts accumulated since the last flush to storage
+    ///
+    /// Pending counts are only cleared once the write commits, so a failed
+    /// flush loses nothing.
+    fn flush(&mut self, now: Instant) -> Result<(), DaemonError> {
+        self.last_flush = now;
+        // Nothing pending; don't commit an empty transaction
+        let Some(started_at) = self.pending_started_at else {
+            return Ok(());
+        };
+
+        let deltas = self
+            .pending_hourly
+            .iter()
+            .map(|(&(hour_bucket, key_type), &count)| (hour_bucket, key_type.name(), count));
+        // Default window for now
+        self.storage.record_batch(
+            "Unknown",
+            "Unknown",
+            self.pending_keystrokes,
+            started_at,
+            deltas,
+        )?;
+
+        self.pending_keystrokes = 0;
+        self.pending_started_at = None;
+        self.pending_hourly.clear();
+        Ok(())
     }
 
-    pub fn read_pid() -> Result<u32, DaemonError> {
-        std::fs::read_to_string(PID_FILE)?
-            .trim()
-            .parse()
-            .map_err(|_| DaemonError::InvalidPidFile)
+    pub fn is_running() -> bool {
+        // The instance lock is held for the daemon's whole lifetime
+        Config::load()
+            .map(|config| InstanceLock::is_held(&config.data_dir()))
+            .unwrap_or(false)
     }
 }
@@ -11,6 +11,7 @@ use kstrk::{
     storage::SqliteStorage,
     viz,
 };
+use std::io::{self, Write};
 use std::process;
 
 fn main() {
@@ -87,23 +88,18 @@ fn run(cli: Cli) -> Result<(), Box<dyn std::error::Error>> {
         }
 
         Commands::Query { action } => {
-            let config = Config::load()?;
-            let db_path = config.data_dir().join("kstrk.db");
-
-            if !db_path.exists() {
-                eprintln!("No data found. Start tracking first with: kstrk start");
+            let Some(storage) = open_storage()? else {
                 return Ok(());
-            }
-
-            let storage = SqliteStorage::new(&db_path)?;
+            };
             let engine = QueryEngine::new(&storage);
 
             match action {
                 QueryAction::ByProcess { date, limit } => {
                     println!("Keystrokes by process:\n");
                     let results = engine.by_process(limit)?;
+                    let mut out = io::stdout().lock();
                     for (process, count) in results {
-                        println!("  {:30} {:>10}", process, count);
+                        writeln!(out, "  {:30} {:>10}", process, count)?;
                     }
                 }
                 QueryAction::ByWindow {
@@ -114,8 +110,9 @@ fn run(cli: Cli) -> Result<(), Box<dyn std::error::Error>> {
                 } => {
                     println!("Keystrokes by window:\n");
                     let results = engine.by_window(title.as_deref(), process.as_deref(), limit)?;
+                    let mut out = io::stdout().lock();
                     for (process, title, count) in results {
-                        println!("  {} / {} : {}", process, title, count);
+                        writeln!(out, "  {} / {} : {}", process, title, count)?;
                     }
                 }
                 QueryAction::Active { threshold, date } => {
@@ -133,25 +130,14 @@ fn run(cli: Cli) -> Result<(), Box<dyn std::error::Error>> {
         }
 
         Commands::Heatmap { range, ascii } => {
-            let config = Config::load()?;
-            let db_path = config.data_dir().join("kstrk.db");
-
-            if !db_path.exists() {
-                eprintln!("No data found. Start tracking first with: kstrk start");
+            let Some(storage) = open_storage()? else {
                 return Ok(());
-            }
-
-            let storage = SqliteStorage::new(&db_path)?;
-            let data = storage.get_heatmap_data()?;
+            };
+            let counts = storage.get_heatmap_counts()?;
 
             println!("Keyboard Heatmap ({})\n", range);
 
             if ascii {
-                // Convert data to HashMap for visualization
-                let mut counts = std::collections::HashMap::new();
-                for (key, count) in data {
-                    counts.insert(key, count);
-                }
                 let heatmap = viz::render_ascii_heatmap(&counts);
                 println!("{}", heatmap);
                 println!("\nLegend: ░ low  ▒ medium  ▓ high  █ very high");
@@ -161,55 +147,47 @@ fn run(cli: Cli) -> Result<(), Box<dyn std::error::Error>> {
         }
 
         Commands::Stats { range } => {
-            let config = Config::load()?;
-            let db_path = config.data_dir().join("kstrk.db");
-
-            if !db_path.exists() {
-                eprintln!("No data found. Start tracking first with: kstrk start");
+            let Some(storage) = open_storage()? else {
                 return Ok(());
-            }
-
-            let storage = SqliteStorage::new(&db_path)?;
+            };
             let total = storage.get_total_keystrokes()?;
-            let by_process = storage.get_keystrokes_by_process()?;
+            let top_processes = storage.get_top_processes(10)?;
 
             println!("Statistics ({})\n", range);
             println!("─────────────────────────");
             println!("Total keystrokes: {}", total);
             println!("\nTop processes:");
-            for (i, (process, count)) in by_process.iter().take(10).enumerate() {
-                println!("  {}. {:30} {:>10}", i + 1, process, count);
+            let mut out = io::stdout().lock();
+            for (i, (process, count)) in top_processes.iter().enumerate() {
+                writeln!(out, "  {}. {:30} {:>10}", i + 1, process, count)?;
             }
         }
 
         Commands::Milestones => {
-            let config = Config::load()?;
-            let db_path = config.data_dir().join("kstrk.db");
-
-            if !db_path.exists() {
-                eprintln!("No data found. Start tracking first with: kstrk start");
+            let Some(storage) = open_storage()? else {
                 return Ok(());
-            }
-
-            let storage = SqliteStorage::new(&db_path)?;
+            };
             let total = storage.get_total_keystrokes()?;
 
             println!("🏆 Milestones\n");
             println!("─────────────────────────────────");
 
             use kstrk::stats::MILESTONES;
+            let mut out = io::stdout().lock();
             for milestone in MILESTONES {
                 if total >= milestone.threshold {
-                    println!(
+                    writeln!(
+                        out,
                         "✓ {} {:20} — {:>15}",
                         milestone.emoji, milestone.name, milestone.threshold
-                    );
+                    )?;
                 } else {
                     let remaining = milestone.threshold - total;
-                    println!(
+                    writeln!(
+                        out,
                         "○ {} {:20} — {:>15} (need {} more)",
                         milestone.emoji, milestone.name, milestone.threshold, remaining
-                    );
+                    )?;
                 }
             }
         }
@@ -251,3 +229,16 @@ fn run(cli: Cli) -> Result<(), Box<dyn std::error::Error>> {
 
     Ok(())
 }
+
+/// Open the tracking database, or report that nothing has been recorded yet
+fn open_storage() -> Result<Option<SqliteStorage>, Box<dyn std::error::Error>> {
+    let config = Config::load()?;
+    let db_path = config.data_dir().join("kstrk.db");
+
+    if !db_path.exists() {
+        eprintln!("No data found. Start tracking first with: kstrk start");
+        return Ok(None);
+    }
+
+    Ok(Some(SqliteStorage::new(&db_path)?))
+}
@@ -13,9 +13,7 @@ impl<'a> QueryEngine<'a> {
 
     /// Query keystrokes by process
     pub fn by_process(&self, limit: usize) -> Result<Vec<(String, u64)>, rusqlite::Error> {
-        let mut results = self.storage.get_keystrokes_by_process()?;
-        results.truncate(limit);
-        Ok(results)
+        self.storage.get_top_processes(limit)
     }
 
     /// Query keystrokes by window
@@ -22,12 +22,19 @@ pub struct LiveStats {
     current_streak: u32,
     last_active_date: Option<NaiveDate>,
 
-    // Milestones
+    // Milestones, in ascending threshold order
     milestones_reached: Vec<Milestone>,
+    // Index of the first milestone not yet reached
+    next_milestone: usize,
 }
 
 impl LiveStats {
     pub fn new(window_secs: u64) -> Self {
+        // record_at only ever checks the next unreached milestone
+        debug_assert!(
+            MILESTONES.windows(2).all(|w| w[0].threshold < w[1].threshold),
+            "MILESTONES must be in ascending threshold order"
+        );
         Self {
             recent_events: VecDeque::with_capacity(1000),
             window_duration: Duration::from_secs(window_secs),
@@ -36,12 +43,20 @@ impl LiveStats {
             current_streak: 0,
             last_active_date: None,
             milestones_reached: MILESTONES.to_vec(),
+            next_milestone: 0,
         }
     }
 
     /// Record a keystroke and check for milestones
     pub fn record(&mut self) -> Option<&Milestone> {
-        let now = Instant::now();
+        self.record_at(Instant::now(), Utc::now())
+    }
+
+    /// Record a keystroke that happened at `now` / `at`
+    ///
+    /// Callers that already know when the key was pressed pass it in, so
+    /// the clocks are read at most once per keystroke.
+    pub fn record_at(&mut self, now: Instant, at: DateTime<Utc>) -> Option<&Milestone> {
         self.recent_events.push_back(now);
         self.total_keystrokes += 1;
 
@@ -52,7 +67,7 @@ impl LiveStats {
         }
 
         // Update streak
-        let today = Utc::now().date_naive();
+        let today = at.date_naive();
         if let Some(last_date) = self.last_active_date {
             if today != last_date {
                 let days_diff = (today - last_date).num_days();
@@ -67,14 +82,14 @@ impl LiveStats {
         }
         self.last_active_date = Some(today);
 
-        // Check milestones
-        self.milestones_reached
-            .iter_mut()
-            .find(|m| m.reached_at.is_none() && self.total_keystrokes >= m.threshold)
-            .map(|m| {
-                m.reached_at = Some(Utc::now());
-                &*m
-            })
+        // Check milestones: only the next unreached one can trigger
+        let milestone = self.milestones_reached.get_mut(self.next_milestone)?;
+        if self.total_keystrokes < milestone.threshold {
+            return None;
+        }
+        milestone.reached_at = Some(at);
+        self.next_milestone += 1;
+        Some(milestone)
     }
 
     /// Actions Per Minute (rolling window)
@@ -88,7 +103,9 @@ impl LiveStats {
     pub fn kps(&self) -> f64 {
         let now = Instant::now();
         let cutoff = now - Duration::from_secs(5);
-        let recent = self.recent_events.iter().filter(|&&t| t >= cutoff).count();
+        // Events are pushed in time order, so the cutoff is a binary search away
+        let stale = self.recent_events.partition_point(|&t| t < cutoff);
+        let recent = self.recent_events.len() - stale;
         recent as f64 / 5.0
     }
 
@@ -131,6 +148,13 @@ mod tests {
     use super::*;
     use std::thread;
 
+    #[test]
+    fn test_milestones_ascending() {
+        assert!(MILESTONES
+            .windows(2)
+            .all(|w| w[0].threshold < w[1].threshold));
+    }
+
     #[test]
     fn test_initial_state() {
         let stats = LiveStats::new(60);
@@ -161,6 +185,20 @@ mod tests {
         assert_eq!(stats.apm(), 60.0);
     }
 
+    #[test]
+    fn test_kps_counts_last_five_seconds() {
+        let mut stats = LiveStats::new(60);
+        let at = Utc::now();
+        let now = Instant::now();
+
+        stats.record_at(now - Duration::from_secs(10), at);
+        for _ in 0..10 {
+            stats.record_at(now, at);
+        }
+
+        assert_eq!(stats.kps(), 2.0);
+    }
+
     #[test]
     fn test_window_pruning() {
         // Use a very short window for testing
@@ -194,4 +232,28 @@ mod tests {
         assert!(latest.is_some());
         assert_eq!(latest.unwrap().threshold, 1000);
     }
+
+    #[test]
+    fn test_milestone_fires_once() {
+        let mut stats = LiveStats::new(60);
+
+        let fired = (0..10_000).filter(|_| stats.record().is_some()).count();
+
+        assert_eq!(fired, 2);
+        assert_eq!(stats.latest_milestone().unwrap().threshold, 10_000);
+    }
+
+    #[test]
+    fn test_record_at_uses_given_time() {
+        let mut stats = LiveStats::new(60);
+        let at = Utc::now() - chrono::Duration::days(3);
+
+        let mut reached = None;
+        for _ in 0..1000 {
+            reached = stats.record_at(Instant::now(), at).map(|m| m.reached_at);
+        }
+
+        assert_eq!(reached, Some(Some(at)));
+        assert_eq!(stats.streak(), 1);
+    }
 }
@@ -3,6 +3,7 @@
 use crate::capture::KeyEvent;
 use chrono::{DateTime, Utc};
 use rusqlite::{Connection, Result};
+use std::collections::HashMap;
 use std::path::Path;
 
 pub struct SqliteStorage {
@@ -13,6 +14,12 @@ impl SqliteStorage {
     /// Create a new storage instance with the given database path
     pub fn new(path: &Path) -> Result<Self> {
         let conn = Connection::open(path)?;
+        // WAL with NORMAL sync: periodic flushes append to the log instead of
+        // rewriting pages, and only checkpoints need a full sync
+        conn.pragma_update_and_check(None, "journal_mode", "WAL", |row| {
+            row.get::<_, String>(0)
+        })?;
+        conn.pragma_update(None, "synchronous", "NORMAL")?;
         let storage = Self { conn };
         storage.init_schema()?;
         Ok(storage)
@@ -74,40 +81,41 @@ impl SqliteStorage {
         )
     }
 
-    /// Record a keystroke event
+    /// Record `key_count` keystrokes, the first of which was at `started_at`
+    ///
+    /// Runs on every daemon flush, so its statements go through the
+    /// connection's prepared-statement cache instead of being re-parsed.
     pub fn record_keystroke(
         &self,
         process: &str,
         window: &str,
         key_count: u32,
+        started_at: DateTime<Utc>,
     ) -> Result<i64> {
         // Get or create process
-        self.conn.execute(
-            "INSERT OR IGNORE INTO processes (name) VALUES (?1)",
-            [process],
-        )?;
-        let process_id: i64 = self.conn.query_row(
-            "SELECT id FROM processes WHERE name = ?1",
-            [process],
-            |row| row.get(0),
-        )?;
+        self.conn
+            .prepare_cached("INSERT OR IGNORE INTO processes (name) VALUES (?1)")?
+            .execute([process])?;
+        let process_id: i64 = self
+            .conn
+            .prepare_cached("SELECT id FROM processes WHERE name = ?1")?
+            .query_row([process], |row| row.get(0))?;
 
         // Get or create window
-        self.conn.execute(
-            "INSERT OR IGNORE INTO windows (process_id, title) VALUES (?1, ?2)",
-            rusqlite::params![process_id, window],
-        )?;
-        let window_id: i64 = self.conn.query_row(
-            "SELECT id FROM windows WHERE process_id = ?1 AND title = ?2",
-            rusqlite::params![process_id, window],
-            |row| row.get(0),
-        )?;
+        self.conn
+            .prepare_cached("INSERT OR IGNORE INTO windows (process_id, title) VALUES (?1, ?2)")?
+            .execute(rusqlite::params![process_id, window])?;
+        let window_id: i64 = self
+            .conn
+            .prepare_cached("SELECT id FROM windows WHERE process_id = ?1 AND title = ?2")?
+            .query_row(rusqlite::params![process_id, window], |row| row.get(0))?;
 
         // Insert key record
-        self.conn.execute(
-            "INSERT INTO keys (window_id, key_count, started_at) VALUES (?1, ?2, ?3)",
-            rusqlite::params![window_id, key_count, Utc::now().to_rfc3339()],
-        )?;
+        self.conn
+            .prepare_cached(
+                "INSERT INTO keys (window_id, key_count, started_at) VALUES (?1, ?2, ?3)",
+            )?
+            .execute(rusqlite::params![window_id, key_count, started_at.to_rfc3339()])?;
 
         Ok(self.conn.last_insert_rowid())
     }
@@ -121,41 +129,73 @@ impl SqliteStorage {
         )
     }
 
-    /// Get keystrokes by process
-    pub fn get_keystrokes_by_process(&self) -> Result<Vec<(String, u64)>> {
+    /// Get the top `limit` processes by keystrokes
+    ///
+    /// The limit is applied in SQL so only the requested rows are read back.
+    pub fn get_top_processes(&self, limit: usize) -> Result<Vec<(String, u64)>> {
         let mut stmt = self.conn.prepare(
             "SELECT p.name, SUM(k.key_count) as total
              FROM keys k
              JOIN windows w ON k.window_id = w.id
              JOIN processes p ON w.process_id = p.id
              GROUP BY p.id
-             ORDER BY total DESC",
+             ORDER BY total DESC
+             LIMIT ?1",
         )?;
 
-        let rows = stmt.query_map([], |row| {
+        let rows = stmt.query_map([limit as i64], |row| {
             Ok((row.get::<_, String>(0)?, row.get::<_, u64>(1)?))
         })?;
 
         rows.collect()
     }
 
-    /// Record hourly aggregate for heatmap
-    pub fn record_hourly_stat(&self, hour_bucket: i64, key_type: &str) -> Result<()> {
-        self.conn.execute(
-            "INSERT INTO hourly_stats (hour_bucket, key_type, count) VALUES (?1, ?2, 1)
-             ON CONFLICT(hour_bucket, key_type) DO UPDATE SET count = count + 1",
-            rusqlite::params![hour_bucket, key_type],
-        )?;
+    /// Add `count` keystrokes to the hourly aggregate for heatmap
+    pub fn record_hourly_stat(
+        &self,
+        hour_bucket: i64,
+        key_type: &str,
+        count: u64,
+    ) -> Result<()> {
+        self.conn
+            .prepare_cached(
+                "INSERT INTO hourly_stats (hour_bucket, key_type, count) VALUES (?1, ?2, ?3)
+                 ON CONFLICT(hour_bucket, key_type) DO UPDATE SET count = count + excluded.count",
+            )?
+            .execute(rusqlite::params![hour_bucket, key_type, count as i64])?;
         Ok(())
     }
 
-    /// Get heatmap data
-    pub fn get_heatmap_data(&self) -> Result<Vec<(String, u64)>> {
+    /// Record a batch of keystrokes and its hourly deltas in a single
+    /// transaction
+    ///
+    /// One commit covers the whole batch, so a crash never leaves totals
+    /// and the heatmap disagreeing.
+    pub fn record_batch<S: AsRef<str>>(
+        &self,
+        process: &str,
+        window: &str,
+        key_count: u32,
+        started_at: DateTime<Utc>,
+        deltas: impl IntoIterator<Item = (i64, S, u64)>,
+    ) -> Result<()> {
+        let tx = self.conn.unchecked_transaction()?;
+        self.record_keystroke(process, window, key_count, started_at)?;
+        for (hour_bucket, key_type, count) in deltas {
+            self.record_hourly_stat(hour_bucket, key_type.as_ref(), count)?;
+        }
+        tx.commit()
+    }
+
+    /// Get heatmap counts keyed by key name
+    ///
+    /// Rows are collected straight into the map the renderer consumes,
+    /// so no ordering or intermediate list is needed.
+    pub fn get_heatmap_counts(&self) -> Result<HashMap<String, u64>> {
         let mut stmt = self.conn.prepare(
-            "SELECT key_type, SUM(count) as total
+            "SELECT key_type, SUM(count)
              FROM hourly_stats
-             GROUP BY key_type
-             ORDER BY total DESC",
+             GROUP BY key_type",
         )?;
 
         let rows = stmt.query_map([], |row| {
@@ -181,7 +221,7 @@ mod tests {
         let storage = SqliteStorage::in_memory().unwrap();
 
         let id = storage
-            .record_keystroke("VSCode", "main.rs - kstrk", 10)
+            .record_keystroke("VSCode", "main.rs - kstrk", 10, Utc::now())
             .unwrap();
         assert!(id > 0);
 
@@ -192,25 +232,92 @@ mod tests {
     fn test_multiple_keystrokes() {
         let storage = SqliteStorage::in_memory().unwrap();
 
-        storage.record_keystroke("VSCode", "main.rs", 10).unwrap();
-        storage.record_keystroke("VSCode", "main.rs", 20).unwrap();
-        storage.record_keystroke("Terminal", "zsh", 5).unwrap();
+        storage.record_keystroke("VSCode", "main.rs", 10, Utc::now()).unwrap();
+        storage.record_keystroke("VSCode", "main.rs", 20, Utc::now()).unwrap();
+        storage.record_keystroke("Terminal", "zsh", 5, Utc::now()).unwrap();
 
         assert_eq!(storage.get_total_keystrokes().unwrap(), 35);
     }
 
     #[test]
-    fn test_keystrokes_by_process() {
+    fn test_top_processes_totals() {
         let storage = SqliteStorage::in_memory().unwrap();
 
-        storage.record_keystroke("VSCode", "main.rs", 100).unwrap();
-        storage.record_keystroke("VSCode", "lib.rs", 50).unwrap();
-        storage.record_keystroke("Terminal", "zsh", 30).unwrap();
+        storage.record_keystroke("VSCode", "main.rs", 100, Utc::now()).unwrap();
+        storage.record_keystroke("VSCode", "lib.rs", 50, Utc::now()).unwrap();
+        storage.record_keystroke("Terminal", "zsh", 30, Utc::now()).unwrap();
 
-        let by_process = storage.get_keystrokes_by_process().unwrap();
+        let by_process = storage.get_top_processes(10).unwrap();
 
         assert_eq!(by_process.len(), 2);
         assert_eq!(by_process[0], ("VSCode".to_string(), 150));
         assert_eq!(by_process[1], ("Terminal".to_string(), 30));
     }
+
+    #[test]
+    fn test_top_processes_limit() {
+        let storage = SqliteStorage::in_memory().unwrap();
+
+        storage.record_keystroke("VSCode", "main.rs", 100, Utc::now()).unwrap();
+        storage.record_keystroke("Terminal", "zsh", 30, Utc::now()).unwrap();
+        storage.record_keystroke("Safari", "docs", 60, Utc::now()).unwrap();
+
+        let top = storage.get_top_processes(2).unwrap();
+
+        assert_eq!(top.len(), 2);
+        assert_eq!(top[0], ("VSCode".to_string(), 100));
+        assert_eq!(top[1], ("Safari".to_string(), 60));
+    }
+
+    #[test]
+    fn test_heatmap_counts() {
+        let storage = SqliteStorage::in_memory().unwrap();
+
+        storage.record_hourly_stat(1, "a", 1).unwrap();
+        storage.record_hourly_stat(1, "a", 4).unwrap();
+        storage.record_hourly_stat(2, "a", 2).unwrap();
+        storage.record_hourly_stat(2, "b", 1).unwrap();
+
+        let counts = storage.get_heatmap_counts().unwrap();
+
+        assert_eq!(counts.len(), 2);
+        assert_eq!(counts["a"], 7);
+        assert_eq!(counts["b"], 1);
+    }
+
+    #[test]
+    fn test_record_batch() {
+        let storage = SqliteStorage::in_memory().unwrap();
+
+        storage
+            .record_batch(
+                "Unknown",
+                "Unknown",
+                6,
+                Utc::now(),
+                [(1, "a", 3), (1, "b", 2), (2, "a", 1)],
+            )
+            .unwrap();
+
+        assert_eq!(storage.get_total_keystrokes().unwrap(), 6);
+        let counts = storage.get_heatmap_counts().unwrap();
+        assert_eq!(counts["a"], 4);
+        assert_eq!(counts["b"], 2);
+    }
+
+    #[test]
+    fn test_record_keystroke_started_at() {
+        let storage = SqliteStorage::in_memory().unwrap();
+        let started_at = Utc::now() - chrono::Duration::seconds(3);
+
+        storage
+            .record_keystroke("VSCode", "main.rs", 4, started_at)
+            .unwrap();
+
+        let stored: String = storage
+            .conn
+            .query_row("SELECT started_at FROM keys", [], |row| row.get(0))
+            .unwrap();
+        assert_eq!(stored, started_at.to_rfc3339());
+    }
 }
@@ -1,7 +1,9 @@
 //! Tokenization module - space and time-based splitting
 
 use crate::capture::{KeyEvent, KeyType, SpecialKey};
-use chrono::{DateTime, Utc};
+use chrono::{DateTime, Duration, Utc};
+use lazy_static::lazy_static;
+use regex::Regex;
 use serde::{Deserialize, Serialize};
 
 #[derive(Debug, Clone)]
@@ -27,34 +29,56 @@ pub struct Token {
     pub key_count: usize,
 }
 
+const CODE_INDICATORS: &[&str] = &[
+    "fn ", "let ", "if ", "for ", "while ", // Rust
+    "def ", "class ", "import ",            // Python
+    "function", "const ", "var ",           // JS
+    "->", "=>", "::", "||", "&&",           // Operators
+    "()", "[]", "{}",                       // Brackets
+];
+
+lazy_static! {
+    // All indicators as one literal alternation, matched in a single pass
+    static ref CODE_INDICATOR_RE: Regex = {
+        let alternation: Vec<String> = CODE_INDICATORS
+            .iter()
+            .map(|ind| regex::escape(ind))
+            .collect();
+        Regex::new(&alternation.join("|")).expect("code indicators are escaped literals")
+    };
+}
+
 impl Token {
     /// Check if this token is likely code
     pub fn is_likely_code(&self) -> bool {
-        let code_indicators = [
-            "fn ", "let ", "if ", "for ", "while ", // Rust
-            "def ", "class ", "import ",            // Python
-            "function", "const ", "var ",           // JS
-            "->", "=>", "::", "||", "&&",           // Operators
-            "()", "[]", "{}",                       // Brackets
-        ];
-
-        code_indicators
-            .iter()
-            .any(|ind| self.content.contains(ind))
+        CODE_INDICATOR_RE.is_match(&self.content)
     }
 }
 
 pub struct Tokenizer {
     config: TokenizerConfig,
-    buffer: Vec<KeyEvent>,
+    // Smallest gap that splits a token, converted once from
+    // config.gap_threshold_ms: gaps are compared in whole milliseconds,
+    // so anything short of threshold + 1ms does not split
+    split_gap: Duration,
+    // Pending token, accumulated as events arrive
+    content: String,
+    key_count: usize,
+    started_at: Option<DateTime<Utc>>,
+    ended_at: Option<DateTime<Utc>>,
     last_timestamp: Option<DateTime<Utc>>,
 }
 
 impl Tokenizer {
     pub fn new(config: TokenizerConfig) -> Self {
+        let split_gap = Duration::milliseconds(config.gap_threshold_ms as i64 + 1);
         Self {
             config,
-            buffer: Vec::new(),
+            split_gap,
+            content: String::new(),
+            key_count: 0,
+            started_at: None,
+            ended_at: None,
             last_timestamp: None,
         }
     }
@@ -62,13 +86,9 @@ impl Tokenizer {
     pub fn process(&mut self, event: KeyEvent) -> Option<Token> {
         // Check for time gap
         if let Some(last) = self.last_timestamp {
-            let gap = event
-                .timestamp
-                .signed_duration_since(last)
-                .num_milliseconds();
-            if gap > self.config.gap_threshold_ms as i64 {
+            if event.timestamp.signed_duration_since(last) >= self.split_gap {
                 let token = self.flush();
-                self.buffer.push(event.clone());
+                self.push(&event);
                 self.last_timestamp = Some(event.timestamp);
                 return token;
             }
@@ -81,40 +101,37 @@ impl Tokenizer {
             return token;
         }
 
-        self.buffer.push(event.clone());
+        self.push(&event);
         self.last_timestamp = Some(event.timestamp);
         None
     }
 
-    pub fn flush(&mut self) -> Option<Token> {
-        if self.buffer.len() < self.config.min_token_length {
-            self.buffer.clear();
-            return None;
+    /// Append an event to the pending token
+    fn push(&mut self, event: &KeyEvent) {
+        if let KeyType::Character(c) = event.key_type {
+            self.content.push(c);
         }
+        self.started_at.get_or_insert(event.timestamp);
+        self.ended_at = Some(event.timestamp);
+        self.key_count += 1;
+    }
 
-        let content: String = self
-            .buffer
-            .iter()
-            .filter_map(|e| match &e.key_type {
-                KeyType::Character(c) => Some(*c),
-                _ => None,
-            })
-            .collect();
+    pub fn flush(&mut self) -> Option<Token> {
+        let content = std::mem::take(&mut self.content);
+        let key_count = std::mem::take(&mut self.key_count);
+        let started_at = self.started_at.take();
+        let ended_at = self.ended_at.take();
 
-        if content.is_empty() {
-            self.buffer.clear();
+        if key_count < self.config.min_token_length || content.is_empty() {
             return None;
         }
 
-        let token = Token {
+        Some(Token {
             content,
-            started_at: self.buffer.first()?.timestamp,
-            ended_at: self.buffer.last()?.timestamp,
-            key_count: self.buffer.len(),
-        };
-
-        self.buffer.clear();
-        Some(token)
+            started_at: started_at?,
+            ended_at: ended_at?,
+            key_count,
+        })
     }
 }
 
@@ -122,7 +139,6 @@ impl Tokenizer {
 mod tests {
     use super::*;
     use crate::capture::Modifiers;
-    use chrono::Duration;
 
     fn make_event(c: char, offset_ms: i64) -> KeyEvent {
         KeyEvent {
@@ -176,6 +192,49 @@ mod tests {
         assert_eq!(token.unwrap().content, "hi");
     }
 
+    #[test]
+    fn test_gap_threshold_boundary() {
+        let base = Utc::now();
+        let at = |c, gap: Duration| KeyEvent {
+            keycode: 0,
+            key_type: KeyType::Character(c),
+            timestamp: base + gap,
+            modifiers: Modifiers::default(),
+        };
+        let mut tokenizer = Tokenizer::new(TokenizerConfig::default());
+
+        tokenizer.process(at('a', Duration::zero()));
+        tokenizer.process(at('b', Duration::milliseconds(10)));
+
+        // 500.9ms counts as 500ms, which does not exceed the threshold
+        let gap = Duration::milliseconds(510) + Duration::microseconds(900);
+        assert!(tokenizer.process(at('c', gap)).is_none());
+
+        // A full 501ms does
+        let gap = gap + Duration::milliseconds(501);
+        assert_eq!(tokenizer.process(at('d', gap)).unwrap().content, "abc");
+    }
+
+    #[test]
+    fn test_flush_reports_token_bounds() {
+        let mut tokenizer = Tokenizer::new(TokenizerConfig::default());
+
+        let first = make_event('o', 0);
+        let last = make_event('k', 80);
+        let (started, ended) = (first.timestamp, last.timestamp);
+        tokenizer.process(first);
+        tokenizer.process(last);
+
+        let token = tokenizer.flush().unwrap();
+        assert_eq!(token.content, "ok");
+        assert_eq!(token.key_count, 2);
+        assert_eq!(token.started_at, started);
+        assert_eq!(token.ended_at, ended);
+
+        // Buffer is reset after a flush
+        assert!(tokenizer.flush().is_none());
+    }
+
     #[test]
     fn test_is_likely_code() {
         let token = Token {
@@ -193,5 +252,13 @@ mod tests {
             key_count: 11,
         };
         assert!(!token2.is_likely_code());
+
+        let token3 = Token {
+            content: "a||b".to_string(),
+            started_at: Utc::now(),
+            ended_at: Utc::now(),
+            key_count: 4,
+        };
+        assert!(token3.is_likely_code());
     }
 }
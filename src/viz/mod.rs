@@ -11,21 +11,27 @@ pub const KEYBOARD_LAYOUT: &[&[&str]] = &[
     &["space"],
 ];
 
+/// Heat glyphs from coldest to hottest
+const HEAT_BLOCKS: [char; 4] = ['░', '▒', '▓', '█'];
+
 /// Render ASCII heatmap
 pub fn render_ascii_heatmap(counts: &HashMap<String, u64>) -> String {
-    let blocks = ['░', '▒', '▓', '█'];
     let max = *counts.values().max().unwrap_or(&1);
+    let hottest = HEAT_BLOCKS.len() - 1;
 
-    let mut output = String::new();
+    // Each cell is a block glyph (3 bytes in UTF-8) plus a space, each row a newline
+    let capacity = KEYBOARD_LAYOUT.iter().map(|row| row.len() * 4 + 1).sum();
+    let mut output = String::with_capacity(capacity);
     for row in KEYBOARD_LAYOUT {
         for key in *row {
             let count = *counts.get(*key).unwrap_or(&0);
+            // Integer bucketing: floor(count / max * hottest) without the float round-trip
             let idx = if max == 0 {
                 0
             } else {
-                ((count as f64 / max as f64) * 3.0) as usize
+                (count.saturating_mul(hottest as u64) / max) as usize
             };
-            output.push(blocks[idx.min(3)]);
+            output.push(HEAT_BLOCKS[idx.min(hottest)]);
             output.push(' ');
         }
         output.push('\n');
@@ -54,6 +60,19 @@ mod tests {
         assert!(heatmap.contains('░'));
     }
 
+    #[test]
+    fn test_ascii_heatmap_buckets() {
+        let mut counts = HashMap::new();
+        counts.insert("a".to_string(), 100);
+        counts.insert("s".to_string(), 67);
+        counts.insert("d".to_string(), 34);
+        counts.insert("f".to_string(), 33);
+
+        let heatmap = render_ascii_heatmap(&counts);
+        let home_row = heatmap.lines().nth(2).unwrap();
+        assert!(home_row.starts_with("█ ▓ ▒ ░ "));
+    }
+
     #[test]
     fn test_heat_intensity() {
         assert_eq!(heat_intensity(0, 100), 0.0);